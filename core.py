@@ -1,97 +1,113 @@
 # Makes type hints behave as forward references, allowing us to use the class name in type hints before the class is defined.
 from __future__ import annotations
-# Lets us clone graphs without worrying about shared references.
-from copy import deepcopy
+# Compact, unboxed storage for the trail and the per-variable/per-literal vectors.
+from array import array
 # Type hints for better readability and error checking.
-from typing import Dict, List, Optional, Set
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
 
-class BoolLiteral:
-    """
-    A boolean literal for `variable`. 
-    polarity:
-    * True  means the literal is positive (x)
-    * False means the literal is negative (¬x)
-    """
-    def __init__(self, variable: str, polarity: bool):
-        self.variable = variable
-        self.polarity = polarity
+# A literal is a plain int, MiniSat-style: variable v is encoded as 2*v for the
+# positive literal (x) and 2*v + 1 for the negative literal (¬x), so negation is
+# a single xor. Variables are the (positive) DIMACS variable numbers themselves.
+Lit = int
 
-    def __repr__(self) -> str:
-        prefix = ""
-        if not self.polarity:
-            prefix = "¬"
-        return prefix + self.variable
+# Per-literal truth values stored in Model.values.
+UNASSIGNED = 0
+TRUE = 1
+FALSE = -1
 
-    def __eq__(self, other) -> bool:
-        if not isinstance(other, BoolLiteral):
-            return False
-        return self.variable == other.variable and self.polarity == other.polarity
 
-    def __hash__(self):
-        return hash((self.variable, self.polarity))
+def make_pos(variable: int) -> Lit:
+    return variable << 1
 
-    def is_pos(self) -> bool:
-        return self.polarity
 
-    def is_neg(self) -> bool:
-        return not self.polarity
+def make_neg(variable: int) -> Lit:
+    return (variable << 1) | 1
 
-    @staticmethod
-    def make_pos(variable: str):
-        return BoolLiteral(variable, True)
 
-    @staticmethod
-    def make_neg(variable: str):
-        return BoolLiteral(variable, False)
+def negate(literal: Lit) -> Lit:
+    return literal ^ 1
+
+
+def var(literal: Lit) -> int:
+    return literal >> 1
+
+
+def is_pos(literal: Lit) -> bool:
+    return not literal & 1
+
 
-    def negate(self):
-        return BoolLiteral(self.variable, not self.polarity)
+def is_neg(literal: Lit) -> bool:
+    return bool(literal & 1)
+
+
+def make_lit(variable: int, polarity: bool) -> Lit:
+    """polarity True means the literal is positive (x), False means negative (¬x)."""
+    return make_pos(variable) if polarity else make_neg(variable)
+
+
+def parse_lit(lit_string: str) -> Lit:
+    """Converts a DIMACS token such as "3" or "-3" into a literal."""
+    value = int(lit_string)
+    if value < 0:
+        return make_neg(-value)
+    return make_pos(value)
+
+
+def lit_repr(literal: Lit) -> str:
+    prefix = ""
+    if is_neg(literal):
+        prefix = "¬"
+    return prefix + str(var(literal))
 
 
 class Clause:
     """
     A CNF clause (an OR of literals).
     """
-    def __init__(self, *literals: BoolLiteral):
-        # Store as a set: duplicates disappear automatically.
-        self.literals: Set[BoolLiteral] = set(literals)
+    def __init__(self, *literals: Lit):
+        # Immutable, so the cached hash stays valid. Order is kept because learned
+        # clauses rely on it (watches first); watch swaps happen in State.lits, not here.
+        # dict.fromkeys drops duplicates while preserving order.
+        self.literals: Tuple[Lit, ...] = tuple(dict.fromkeys(literals))
+        # Literal set, filled in on first use; shared by __hash__, __eq__ and learn().
+        self._key: Optional[FrozenSet[Lit]] = None
 
     def __repr__(self) -> str:
-        return self.literals.__repr__()
+        return "{" + ", ".join(lit_repr(l) for l in self.literals) + "}"
     
     def __iter__(self):
         return iter(self.literals)
     
+    @property
+    def key(self) -> FrozenSet[Lit]:
+        """The set of literals; two clauses are equal iff their keys are."""
+        if self._key is None:
+            self._key = frozenset(self.literals)
+        return self._key
+
     def __eq__(self, other) -> bool:
         # Two clauses are equal if they have the same set of literals
-        return isinstance(other, Clause) and self.literals == other.literals
+        return isinstance(other, Clause) and self.key == other.key
 
     def __hash__(self) -> int:
-        # Needed so Clause can be compared and stored in sets
-        return hash(frozenset(self.literals))
+        # Needed so Clause can be compared and stored in sets; frozenset caches its hash.
+        return hash(self.key)
 
-    def eval(self, assignment: Dict[str, bool]) -> bool:
+    def eval(self, assignment: Dict[int, bool]) -> bool:
         """Returns true if the given variable assignment satisfies the clause, and false otherwise."""
         for literal in self.literals:
-            if literal.variable in assignment:
-                lit_value = assignment[literal.variable]
-                if lit_value and literal.is_pos() or not lit_value and literal.is_neg():
-                    return True
+            value = assignment.get(var(literal))
+            if value is not None and value == is_pos(literal):
+                return True
         return False
 
     @staticmethod
     def make(*lit_strings: str) -> "Clause":
         """Convenience for small tests: Clause.make("1","-2","3")"""
-        literals: List[BoolLiteral] = []
-        for lit_string in lit_strings:
-            if lit_string.startswith("-"):
-                literals.append(BoolLiteral.make_neg(lit_string[1:]))
-            else:
-                literals.append(BoolLiteral.make_pos(lit_string))
-        return Clause(*literals)
+        return Clause(*(parse_lit(lit_string) for lit_string in lit_strings))
 
     @staticmethod
-    def check(cnf: List[Clause], assignment: Dict[str, bool]) -> bool:
+    def check(cnf: List[Clause], assignment: Dict[int, bool]) -> bool:
         """Returns false if the given variable assignment fails to satisfy a set of clauses, and true otherwise."""
         for clause in cnf:
             if not clause.eval(assignment):
@@ -106,22 +122,22 @@ class ImplicationGraph:
     """
     def __init__(
         self,
-        edges: Optional[Dict[BoolLiteral, Set[BoolLiteral]]] = None,
-        conflict_clause: Optional[Set[BoolLiteral]] = None,
+        edges: Optional[Dict[Lit, Set[Lit]]] = None,
+        conflict_clause: Optional[Set[Lit]] = None,
     ):
-        self.edges: Dict[BoolLiteral, Set[BoolLiteral]] = edges if edges is not None else {}
-        self.conflict_clause: Optional[Set[BoolLiteral]] = conflict_clause
+        self.edges: Dict[Lit, Set[Lit]] = edges if edges is not None else {}
+        self.conflict_clause: Optional[Set[Lit]] = conflict_clause
 
-    def add_node(self, node: BoolLiteral) -> None:
+    def add_node(self, node: Lit) -> None:
         self.edges.setdefault(node, set())
 
-    def add_edge(self, src: BoolLiteral, tgt: BoolLiteral) -> None:
+    def add_edge(self, src: Lit, tgt: Lit) -> None:
         self.edges.setdefault(tgt, set()).add(src)
 
-    def add_conflict(self, srcs: Set[BoolLiteral]) -> None:
+    def add_conflict(self, srcs: Set[Lit]) -> None:
         self.conflict_clause = set(srcs)
 
-    def explain(self, node: BoolLiteral) -> None:
+    def explain(self, node: Lit) -> None:
         """One resolution-like step.
 
         - remove ¬node from conflict clause
@@ -130,120 +146,158 @@ class ImplicationGraph:
         if self.conflict_clause is None:
             return
 
-        self.conflict_clause.discard(node.negate())
+        self.conflict_clause.discard(negate(node))
         for parent in self.edges.get(node, set()):
-            self.conflict_clause.add(parent.negate())
+            self.conflict_clause.add(negate(parent))
 
     def __repr__(self) -> str:
         out = []
         for tgt, srcs in self.edges.items():
             for src in srcs:
-                out.append(f"{src!r} -> {tgt!r}")
+                out.append(f"{lit_repr(src)} -> {lit_repr(tgt)}")
         return "\n".join(out) + ("\n" if out else "")
 
     def __deepcopy__(self, memo):
-        return ImplicationGraph(deepcopy(self.edges), deepcopy(self.conflict_clause))
+        # Literals are immutable ints, so copying each parent set is a full deep copy.
+        edges = {tgt: srcs.copy() for tgt, srcs in self.edges.items()}
+        conflict_clause = None if self.conflict_clause is None else self.conflict_clause.copy()
+        return ImplicationGraph(edges, conflict_clause)
 
 
 class Model:
     """
     A variable assignment.
     """
-    def __init__(self):
-        self.assignment: List[BoolLiteral] = []
+    __slots__ = ("assignment", "decisions", "decision_level", "decision_levels", "trail", "values")
+
+    def __init__(self, var_slots: int):
+        # var_slots is the size of the per-variable arrays: the largest variable id + 1.
+        self.assignment: Sequence[Lit] = array("i")
         self.decision_level: int = 0
         # decisions stores the assignment index where each decision level starts
         self.decisions: List[int] = []
-        self.decision_levels: Dict[str, int] = {}
-        self.trail: Dict[str, int] = {}
-
-    def __contains__(self, literal: BoolLiteral) -> bool:
-        return literal in self.assignment
-
-    def assign(self, literal: BoolLiteral) -> None:
+        # Both indexed by variable. Entries are only meaningful while the variable is
+        # assigned (see values): backjump leaves stale entries behind instead of
+        # clearing them, and -1 marks a variable that was never assigned.
+        self.decision_levels: Sequence[int] = array("i", [-1]) * var_slots
+        self.trail: Sequence[int] = array("i", [-1]) * var_slots
+        # Indexed by literal: TRUE, FALSE or UNASSIGNED. The assignment array above
+        # only keeps the trail order for backjump.
+        self.values: Sequence[int] = array("b", [UNASSIGNED]) * (2 * var_slots)
+
+    def __contains__(self, literal: Lit) -> bool:
+        return self.values[literal] == TRUE
+
+    def assign(self, literal: Lit) -> None:
         # assign = forced (propagation)
-        self.trail[literal.variable] = len(self.assignment)
+        self.trail[var(literal)] = len(self.assignment)
         self.assignment.append(literal)
-        self.decision_levels[literal.variable] = self.decision_level
+        self.decision_levels[var(literal)] = self.decision_level
+        self.values[literal] = TRUE
+        self.values[negate(literal)] = FALSE
 
-    def assigned(self, variable: str):
+    def is_unassigned(self, literal: Lit) -> bool:
+        """Returns True if neither the literal nor its negation is in the model."""
+        return self.values[literal] == UNASSIGNED
+
+    def assigned(self, variable: int):
         """
         Returns True if the variable for the given literal is already assigned by 
         the model.
         """
-        return BoolLiteral.make_pos(variable) in self.assignment or BoolLiteral.make_neg(variable) in self.assignment
+        return self.values[make_pos(variable)] != UNASSIGNED
 
-    def decide(self, literal: BoolLiteral) -> None:
+    def decide(self, literal: Lit) -> None:
         # decide = guess at a new decision level
         self.decision_level += 1
         self.decisions.append(len(self.assignment))
         self.assign(literal)
 
-    def backjump(self, decision_level: int) -> None:
+    def level_start(self, decision_level: int) -> int:
+        """Returns the trail index where decision level decision_level + 1 starts."""
         if decision_level < len(self.decisions):
-            idx = self.decisions[decision_level]
-        else:
-            # Backjumping to the current decision level
-            idx = len(self.assignment)
+            return self.decisions[decision_level]
+        # Nothing is assigned above the current decision level
+        return len(self.assignment)
+
+    def literals_above(self, decision_level: int) -> Sequence[Lit]:
+        """Returns the literals assigned above decision_level, i.e. those backjump() removes."""
+        return self.assignment[self.level_start(decision_level):]
+
+    def backjump(self, decision_level: int) -> Sequence[Lit]:
+        """Undo every assignment above decision_level and return the removed literals."""
+        idx = self.level_start(decision_level)
         removed = self.assignment[idx:]
 
-        self.assignment = self.assignment[:idx]
-        self.decisions = self.decisions[:decision_level]
+        # Truncate the trail and the level stack in place.
+        del self.assignment[idx:]
+        del self.decisions[decision_level:]
         self.decision_level = decision_level
 
-        # Remove stale decision level mappings
+        # Unassign the removed literals; their decision levels are left stale.
+        values = self.values
         for lit in removed:
-            self.decision_levels.pop(lit.variable, None)
+            values[lit] = UNASSIGNED
+            values[negate(lit)] = UNASSIGNED
+        return removed
 
-    def get_current_decision_literals(self) -> List[BoolLiteral]:
+    def get_current_decision_literals(self) -> Sequence[Lit]:
         if not self.decisions:
             return self.assignment
         return self.assignment[self.decisions[-1]:]
 
-    def get_last_literal(self) -> BoolLiteral:
+    def get_last_literal(self) -> Lit:
         return self.assignment[-1]
 
     # correctly checks both literal and its negation
-    def get_level(self, literal: BoolLiteral) -> int:
+    def get_level(self, literal: Lit) -> int:
         """IMPORTANT: learned clauses can contain ¬x even if the model stores x.
 
         So if literal isn't found, we also try its negation.
 
         NOTE: we preserve the invariant that x and ¬x cannot both be contained in the 
-        current model, so the decision level need only track variable *name*, not the 
-        literal.
+        current model, so the decision level need only track the variable, not the 
+        literal. Unassigned variables report level -1.
         """
-        lvl = self.decision_levels.get(literal.variable, None)
+        if self.values[literal] == UNASSIGNED:
+            return -1
+        lvl = self.decision_levels[var(literal)]
         return lvl
 
-    def at_current_level(self, clause: iter(BoolLiteral)) -> List[BoolLiteral]:
+    def at_current_level(self, clause: iter(Lit)) -> List[Lit]:
         """Returns all the literals in the provided clause that are in the current decision level."""
-        return [literal for literal in clause if self.decision_levels.get(literal.variable) == self.decision_level]
+        return [
+            literal for literal in clause
+            if self.values[literal] != UNASSIGNED and self.decision_levels[var(literal)] == self.decision_level
+        ]
 
-    def count_at_current_level(self, clause: iter(BoolLiteral)) -> int:
+    def count_at_current_level(self, clause: iter(Lit)) -> int:
         """Returns the number of literals in the provided clause that are at the current decision level."""
-        return sum(1 for literal in clause if self.decision_levels.get(literal.variable) == self.decision_level)
+        return sum(
+            1 for literal in clause
+            if self.values[literal] != UNASSIGNED and self.decision_levels[var(literal)] == self.decision_level
+        )
 
-    def get_most_recent(self, clause: iter(BoolLiteral)) -> BoolLiteral:
+    def get_most_recent(self, clause: iter(Lit)) -> Lit:
         """
         Returns the most recently assigned literal in the provided clause.
         
         NOTE: clause must intersect the trail nontrivially; will error otherwise.
         TODO: -- check that this invariant holds.
         """
-        return max(clause, key=lambda lit: self.trail[lit.variable])
+        return max(clause, key=lambda lit: self.trail[var(lit)])
 
     def __repr__(self) -> str:
         if self.decision_level == 0:
-            return " ".join(repr(l) for l in self.assignment)
+            return " ".join(lit_repr(l) for l in self.assignment)
 
         out: List[str] = []
         last = 0
         for idx in self.decisions:
-            out.extend(repr(l) for l in self.assignment[last:idx])
+            out.extend(lit_repr(l) for l in self.assignment[last:idx])
             out.append("•")
             last = idx
-        out.extend(repr(l) for l in self.assignment[last:])
+        out.extend(lit_repr(l) for l in self.assignment[last:])
         return " ".join(out)
 
     def __iter__(self):
@@ -254,13 +308,48 @@ class State:
     """
     State for the CDCL proof system.
     """
-    def __init__(self, clauses: List[Clause]):
-        self.clauses = clauses
-        self.model = Model()
+    __slots__ = (
+        "lits", "clause_off", "clause_keys", "num_vars", "var_slots",
+        "model", "conflict", "unsat", "sat",
+    )
+
+    def __init__(self, clauses: List[Clause], num_vars: Optional[int] = None):
+        # Clause database in CSR layout: the literals of clause i are
+        # lits[clause_off[i]:clause_off[i + 1]]. Learned clauses are appended.
+        self.lits: Sequence[Lit] = array("i")
+        self.clause_off: Sequence[int] = array("i", [0])
+        for clause in clauses:
+            self.add_clause(clause.literals)
+        # The literal sets of the clauses, so learn() can test for duplicates in O(1)
+        # with C-level frozenset equality instead of Clause.__eq__.
+        self.clause_keys: Set[FrozenSet[Lit]] = {c.key for c in clauses}
+        # Variables are 1..num_vars: num_vars if given (e.g. from the p cnf header),
+        # otherwise the largest id used. The largest literal has the largest variable.
+        max_var = var(max((max(c.literals) for c in clauses if c.literals), default=0))
+        if num_vars is None:
+            num_vars = max_var
+        elif num_vars < max_var:
+            raise ValueError(f"num_vars is {num_vars} but the clauses use variable {max_var}")
+        self.num_vars = num_vars
+        # Per-variable arrays are indexed by variable id, so they need num_vars + 1 slots.
+        self.var_slots = num_vars + 1
+        self.model = Model(self.var_slots)
         self.conflict = None
         self.unsat = False
         self.sat = False
 
+    def add_clause(self, literals: Sequence[Lit]) -> int:
+        """Append a clause to the database and return its index."""
+        self.lits.extend(literals)
+        self.clause_off.append(len(self.lits))
+        return len(self.clause_off) - 2
+
+    def num_clauses(self) -> int:
+        return len(self.clause_off) - 1
+
+    def clause_literals(self, clause_idx: int) -> Sequence[Lit]:
+        return self.lits[self.clause_off[clause_idx]:self.clause_off[clause_idx + 1]]
+
     def __repr__(self) -> str:
         if self.unsat:
             return "UNSAT"
@@ -268,7 +357,8 @@ class State:
             return "SAT"
         
         out = []
-        out.append("Δ = " + repr(self.clauses))
+        clauses = [Clause(*self.clause_literals(idx)) for idx in range(self.num_clauses())]
+        out.append("Δ = " + repr(clauses))
         out.append("M = " + repr(self.model))
         out.append("C = " + (repr(self.conflict) if self.conflict else "no"))
         return "\n".join(out)
@@ -278,113 +368,325 @@ class Core:
     """ 
     Implements the core CDCL-style rules on the current State.
     """
+    __slots__ = (
+        "parents_flat", "parents_off", "conflict_clause", "in_conflict", "state",
+        "watches", "blockers", "bin_watches", "bin_others", "qhead", "units",
+    )
+
     def __init__(self, state: State):
-        self.graphs: List[ImplicationGraph] = [ImplicationGraph()]
-        self.graph: ImplicationGraph = self.graphs[-1]
+        # Parents of each assigned literal in the implication graph (the true literals
+        # that forced it), stored flat and parallel to the trail: the parents of the
+        # literal at trail position i are parents_flat[parents_off[i]:parents_off[i + 1]].
+        # Decisions have no parents.
+        self.parents_flat: List[Lit] = []
+        self.parents_off: List[int] = [0]
+        self.conflict_clause: Optional[Set[Lit]] = None
         self.in_conflict: bool = False
         self.state = state
 
-    def get_uip(self) -> BoolLiteral:
+        # Two-watched-literal scheme: watches[lit] lists the indices of the clauses
+        # watching lit, i.e. having it at position 0 or 1 of their literals in state.lits.
+        self.watches: List[List[int]] = [[] for _ in range(2 * state.var_slots)]
+        # Blocking literals, parallel to watches: blockers[lit][i] is some other literal
+        # of clause watches[lit][i]. If it is true the clause is satisfied and can be
+        # skipped without loading it.
+        self.blockers: List[List[Lit]] = [[] for _ in range(2 * state.var_slots)]
+        # Binary clauses skip the watch machinery: bin_others[lit][i] is the other
+        # literal of binary clause bin_watches[lit][i], implied as soon as lit is false.
+        self.bin_watches: List[List[int]] = [[] for _ in range(2 * state.var_slots)]
+        self.bin_others: List[List[Lit]] = [[] for _ in range(2 * state.var_slots)]
+        # Propagation queue head (MiniSat's qhead): the watchers of the trail literals
+        # from position qhead onwards have not been visited yet.
+        self.qhead: int = 0
+        # Unit clauses cannot be watched; they are asserted by the first propagate_all().
+        self.units: List[int] = []
+        for idx in range(state.num_clauses()):
+            size = state.clause_off[idx + 1] - state.clause_off[idx]
+            if size == 0:
+                # The empty clause is false under every assignment: conflict at level 0.
+                self.in_conflict = True
+                self.conflict_clause = set()
+                state.conflict = Clause()
+            elif size == 1:
+                self.units.append(idx)
+            else:
+                self.watch(idx)
+
+    def watch(self, clause_idx: int) -> None:
+        """Register the first two literals of a (non-unit) clause as its watches.
+
+        Binary clauses go to the bin_watches/bin_others lists instead.
+        """
+        start = self.state.clause_off[clause_idx]
+        size = self.state.clause_off[clause_idx + 1] - start
+        # In the flat buffer a shorter clause would silently watch its neighbour's literals.
+        if size < 2:
+            raise ValueError(f"clause {clause_idx} has {size} literal(s), cannot be watched")
+        first = self.state.lits[start]
+        second = self.state.lits[start + 1]
+        if size == 2:
+            self.bin_watches[first].append(clause_idx)
+            self.bin_others[first].append(second)
+            self.bin_watches[second].append(clause_idx)
+            self.bin_others[second].append(first)
+            return
+        self.watches[first].append(clause_idx)
+        self.blockers[first].append(second)
+        self.watches[second].append(clause_idx)
+        self.blockers[second].append(first)
+
+    def get_uip(self) -> Lit:
         """
         Returns the UIP following a call to explain().
 
         NOTE: this must be used after explain(), and before backjump() resolves the conflict.
         TODO: check that this invariant holds.
         """
-        return self.state.model.at_current_level(self.graph.conflict_clause)[0]
-
-    def propagate(self, clause_idx: int) -> bool:
-        """Unit propagation using clause_idx.
-        Returns True if it made a new assignment.
-        """
-        clause = self.state.clauses[clause_idx]
-        unassigned_lit: Optional[BoolLiteral] = None
-        num_unassigned = 0
+        return self.state.model.at_current_level(self.conflict_clause)[0]
 
-        for literal in clause:
-            if literal.negate() not in self.state.model:
-                num_unassigned += 1
-                unassigned_lit = literal
+    def parents(self, literal: Lit) -> List[Lit]:
+        """Returns the parents of an assigned literal in the implication graph."""
+        pos = self.state.model.trail[var(literal)]
+        return self.parents_flat[self.parents_off[pos]:self.parents_off[pos + 1]]
 
-        if num_unassigned == 1 and \
-           unassigned_lit not in self.state.model and \
-           unassigned_lit.negate() not in self.state.model:
+    def propagate(self, clause_idx: int) -> None:
+        """Unit propagation using clause_idx, whose only non-false literal is its first one."""
+        lits = self.state.lits
+        start = self.state.clause_off[clause_idx]
+        end = self.state.clause_off[clause_idx + 1]
+        unit_lit = lits[start]
+        parents_flat = self.parents_flat
 
-            self.state.model.assign(unassigned_lit)
-            self.graph.add_node(unassigned_lit)
+        self.state.model.assign(unit_lit)
+        parents_flat.extend(negate(lits[k]) for k in range(start + 1, end))
+        self.parents_off.append(len(parents_flat))
 
-            for literal in clause.literals - {unassigned_lit}:
-                self.graph.add_edge(literal.negate(), unassigned_lit)
-
-            return True
-        return False
+    def propagate_all(self) -> int:
+        """Unit propagation until fixpoint or conflict, driven by the watch lists.
 
-    def decide(self, literal: BoolLiteral) -> bool:
+        Returns the number of new assignments made.
+        """
+        if self.in_conflict:
+            return 0
+
+        # Bind everything the loop touches to locals: it runs once per watch visit.
+        lits = self.state.lits
+        clause_off = self.state.clause_off
+        values = self.state.model.values
+        watches = self.watches
+        blockers = self.blockers
+        bin_watches = self.bin_watches
+        bin_others = self.bin_others
+        trail = self.state.model.assignment
+        propagate = self.propagate
+        count = 0
+
+        for idx in self.units:
+            unit_lit = lits[clause_off[idx]]
+            if values[unit_lit] == FALSE:
+                self.conflict(idx)
+                return count
+            if values[unit_lit] == UNASSIGNED:
+                propagate(idx)
+                count += 1
+        self.units = []
+
+        while self.qhead < len(trail):
+            false_lit = negate(trail[self.qhead])
+            self.qhead += 1
+
+            # Binary clauses first: the other literal is implied directly.
+            others = bin_others[false_lit]
+            for k in range(len(others)):
+                other = others[k]
+                if values[other] == TRUE:
+                    continue
+                clause_idx = bin_watches[false_lit][k]
+                if values[other] == FALSE:
+                    self.conflict(clause_idx)
+                    return count
+                start = clause_off[clause_idx]
+                if lits[start] != other:
+                    lits[start], lits[start + 1] = other, false_lit
+                propagate(clause_idx)
+                count += 1
+
+            watchers = watches[false_lit]
+            watcher_blockers = blockers[false_lit]
+
+            # Compact the watch list in place: i reads, j writes the entries that stay.
+            i = j = 0
+            n = len(watchers)
+            while i < n:
+                clause_idx = watchers[i]
+                blocker = watcher_blockers[i]
+                i += 1
+
+                # Satisfied by the blocking literal: no need to look at the clause.
+                if values[blocker] == TRUE:
+                    watchers[j] = clause_idx
+                    watcher_blockers[j] = blocker
+                    j += 1
+                    continue
+
+                start = clause_off[clause_idx]
+
+                # Keep the false watch at position 1.
+                if lits[start] == false_lit:
+                    lits[start], lits[start + 1] = lits[start + 1], false_lit
+                first = lits[start]
+
+                # Already satisfied by the other watch, which becomes the blocker.
+                if values[first] == TRUE:
+                    watchers[j] = clause_idx
+                    watcher_blockers[j] = first
+                    j += 1
+                    continue
+
+                # Look for a non-false replacement watch.
+                for k in range(start + 2, clause_off[clause_idx + 1]):
+                    if values[lits[k]] != FALSE:
+                        lits[start + 1], lits[k] = lits[k], false_lit
+                        watches[lits[start + 1]].append(clause_idx)
+                        blockers[lits[start + 1]].append(first)
+                        break
+                else:
+                    watchers[j] = clause_idx
+                    watcher_blockers[j] = first
+                    j += 1
+                    if values[first] == FALSE:
+                        # Every literal is false: keep the unvisited watchers and stop.
+                        while i < n:
+                            watchers[j] = watchers[i]
+                            watcher_blockers[j] = watcher_blockers[i]
+                            i += 1
+                            j += 1
+                        del watchers[j:]
+                        del watcher_blockers[j:]
+                        self.conflict(clause_idx)
+                        return count
+                    propagate(clause_idx)
+                    count += 1
+            del watchers[j:]
+            del watcher_blockers[j:]
+        return count
+
+    def decide(self, literal: Lit) -> bool:
         """Make a decision assignment at a new decision level."""
-        if literal not in self.state.model and literal.negate() not in self.state.model:
+        if self.state.model.values[literal] == UNASSIGNED:
             self.state.model.decide(literal)
-            self.graphs.append(deepcopy(self.graph))
-            self.graph = self.graphs[-1]
+            self.parents_off.append(len(self.parents_flat))
             return True
         return False
 
     def conflict(self, clause_idx: int) -> bool:
         """Detect a conflicting clause (all literals are false)."""
         if not self.in_conflict:
-            clause = self.state.clauses[clause_idx]
-            for literal in clause:
-                if literal.negate() not in self.state.model:
+            literals = self.state.clause_literals(clause_idx)
+            values = self.state.model.values
+            for literal in literals:
+                if values[literal] != FALSE:
                     return False
             self.in_conflict = True
-            self.graph.add_conflict(clause.literals)
+            self.conflict_clause = set(literals)
             # Clause(*set) unpacks the set into individual literals.
             # Without this fix, conflict analysis would crash or behave incorrectly.
-            self.state.conflict = Clause(*self.graph.conflict_clause)
+            self.state.conflict = Clause(*self.conflict_clause)
             return True
         return False
 
     def explain(self) -> bool:
-        """Explain conflict until only 1 literal remains at current decision level."""
+        """Explain conflict until only 1 literal remains at current decision level.
+
+        First-UIP analysis: walk the trail backwards, resolving the conflict clause
+        with the parents of each of its literals at the current level, and stop as
+        soon as a single such literal is left (the UIP). The trail is not modified.
+        """
         if not self.in_conflict:
             return False
-        decision_literals = self.graph.conflict_clause
-        while self.state.model.count_at_current_level(decision_literals) > 1:
-            candidates = self.state.model.at_current_level(decision_literals)
-            last_literal = self.state.model.get_most_recent(candidates).negate()
-            self.graph.explain(last_literal)
-            decision_literals = self.graph.conflict_clause
-        self.state.conflict = Clause(*self.graph.conflict_clause)
+        model = self.state.model
+        trail = model.assignment
+        decision_levels = model.decision_levels
+        current_level = model.decision_level
+        parents_flat = self.parents_flat
+        parents_off = self.parents_off
+
+        seen = [False] * self.state.var_slots
+        # Learned literals below the current level. Literals fixed at level 0 are
+        # always false, so they are left out.
+        others: List[Lit] = []
+        # Number of seen literals at the current level not yet resolved on.
+        counter = 0
+        for literal in self.conflict_clause:
+            v = var(literal)
+            seen[v] = True
+            if decision_levels[v] == current_level:
+                counter += 1
+            elif decision_levels[v] > 0:
+                others.append(literal)
+
+        pos = len(trail)
+        while True:
+            pos -= 1
+            while not seen[var(trail[pos])]:
+                pos -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            # Resolve on trail[pos]: its negation leaves, the negations of its parents join.
+            for k in range(parents_off[pos], parents_off[pos + 1]):
+                v = var(parents_flat[k])
+                if not seen[v]:
+                    seen[v] = True
+                    if decision_levels[v] == current_level:
+                        counter += 1
+                    elif decision_levels[v] > 0:
+                        others.append(negate(parents_flat[k]))
+
+        uip_neg = negate(trail[pos])
+        self.conflict_clause = set(others)
+        self.conflict_clause.add(uip_neg)
+
+        # Put the UIP first and the most recent of the other literals second: these
+        # are the literals the learned clause watches once it becomes asserting.
+        others.sort(key=model.get_level, reverse=True)
+        self.state.conflict = Clause(uip_neg, *others)
         return True
 
     def backjump(self, decision_level: int) -> bool:
         """Backjump to decision_level and assert the learned clause."""
-        if not self.in_conflict or self.graph.conflict_clause is None:
+        if not self.in_conflict or self.conflict_clause is None:
             return False
 
-        conflict_clause = self.graph.conflict_clause
+        conflict_clause = self.conflict_clause
         uip_neg = self.get_uip()
 
         # IMPORTANT: conflict_clause contains uip_neg (not decision_literal)
         level = -1
-        for literal in conflict_clause - {uip_neg}:
-            level = max(level, self.state.model.get_level(literal))
+        for literal in conflict_clause:
+            if literal != uip_neg:
+                level = max(level, self.state.model.get_level(literal))
 
         if decision_level >= level:
             self.in_conflict = False
             self.state.model.backjump(decision_level)
+            trail_len = len(self.state.model.assignment)
+            del self.parents_flat[self.parents_off[trail_len]:]
+            del self.parents_off[trail_len + 1:]
+            # Everything left on the trail was fully propagated before the conflict.
+            self.qhead = trail_len
 
             # Assert the negation of the remaining literal.
             self.state.model.assign(uip_neg)
 
             self.state.conflict = None
-            self.graphs = self.graphs[: decision_level + 1]
-            self.graph = self.graphs[-1]
+            self.conflict_clause = None
 
-            # Insert the learned explanation for new assignment into the implication
-            # graph.
-            self.graph.add_node(uip_neg)
-            for literal in conflict_clause - {uip_neg}:
-                self.graph.add_edge(literal.negate(), uip_neg)
+            # Record the learned explanation for the new assignment.
+            for literal in conflict_clause:
+                if literal != uip_neg:
+                    self.parents_flat.append(negate(literal))
+            self.parents_off.append(len(self.parents_flat))
 
             return True
         return False
@@ -402,11 +704,30 @@ class Core:
             return None
 
         learned = self.state.conflict
-        if learned not in self.state.clauses:
-            self.state.clauses.append(learned)
+        key = learned.key
+        if key not in self.state.clause_keys:
+            self.state.clause_keys.add(key)
+            clause_idx = self.state.add_clause(learned.literals)
+            if len(learned.literals) > 1:
+                self.watch(clause_idx)
         return learned
 
+    @property
+    def graph(self) -> ImplicationGraph:
+        """The implication graph of the current trail, rebuilt from the stored parents on demand."""
+        graph = ImplicationGraph()
+        for literal in self.state.model:
+            graph.add_node(literal)
+            for parent in self.parents(literal):
+                graph.add_edge(parent, literal)
+        if self.conflict_clause is not None:
+            graph.add_conflict(self.conflict_clause)
+        return graph
+
     def __repr__(self) -> str:
-        core_string = 'State:\n' + repr(self.state) + '\n'
-        core_string += 'Implication Graph:\n' + repr(self.graph)
-        return core_string
\ No newline at end of file
+        out = []
+        out.append("State:")
+        out.append(repr(self.state))
+        out.append("Implication Graph:")
+        out.append(repr(self.graph))
+        return "\n".join(out)
\ No newline at end of file
@@ -3,8 +3,9 @@
 from __future__ import annotations
 import csv
 import os
-from typing import Dict, Iterable, List
-from solver import SolveResult, solve_dimacs
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Tuple
+from solver import solve_dimacs
 
 
 def find_cnf_files(path: str) -> List[str]:
@@ -21,18 +22,40 @@ def find_cnf_files(path: str) -> List[str]:
     return cnfs
 
 
-def _result_to_row(cnf_path: str, heuristic: str, result: SolveResult) -> Dict[str, object]:
-    return {
-        "file": os.path.basename(cnf_path),
-        "path": cnf_path,
-        "heuristic": heuristic,
-        "status": result.status,
-        "runtime_sec": round(result.runtime_sec, 6),
-        "decisions": result.stats.decisions,
-        "conflicts": result.stats.conflicts,
-        "learned_clauses": result.stats.learned_clauses,
-        "propagations": result.stats.propagations,
-    }
+FIELDNAMES = (
+    "file",
+    "path",
+    "heuristic",
+    "status",
+    "runtime_sec",
+    "decisions",
+    "conflicts",
+    "learned_clauses",
+    "propagations",
+)
+
+
+def _run_one(task: Tuple[str, str, float, int]) -> Tuple[object, ...]:
+    """Solve one (file, heuristic) pair in a worker process and return its CSV row."""
+    cnf_path, h, timeout_sec, seed = task
+    result = solve_dimacs(
+        cnf_path,
+        heuristic_name=h,
+        timeout_sec=timeout_sec,
+        seed=seed,
+    )
+    stats = result.stats
+    return (
+        os.path.basename(cnf_path),
+        cnf_path,
+        h,
+        result.status,
+        round(result.runtime_sec, 6),
+        stats.decisions,
+        stats.conflicts,
+        stats.learned_clauses,
+        stats.propagations,
+    )
 
 
 def run_benchmarks(
@@ -43,6 +66,7 @@ def run_benchmarks(
     run_baseline: bool = True,
     run_vsids: bool = True,
     check_results: bool = False,
+    jobs: Optional[int] = None,
 ) -> None:
     heuristics: List[str] = []
     if run_baseline:
@@ -50,38 +74,32 @@ def run_benchmarks(
     if run_vsids:
         heuristics.append("vsids")
 
-    rows: List[Dict[str, object]] = []
-
-    for cnf_path in cnf_files:
-        results = {}
-        for h in heuristics:
-            result = solve_dimacs(
-                cnf_path,
-                heuristic_name=h,
-                timeout_sec=timeout_sec,
-                seed=seed,
-            )
-
-            results[h] = result.status
-
-            row = _result_to_row(cnf_path, h, result)
-            rows.append(row)
-
+    # Every (file, heuristic) run is independent, so they are spread over a pool of
+    # worker processes (jobs=None uses every CPU). Each run builds its own RNG from
+    # seed, so results do not depend on which worker runs them. maxtasksperchild=1
+    # hands the memory of each run (learned clauses etc.) back to the OS.
+    tasks = [(cnf_path, h, timeout_sec, seed) for cnf_path in cnf_files for h in heuristics]
+    # Statuses per file, for check_results; runs complete in any order.
+    results: Dict[str, Dict[str, str]] = {}
+
+    # Rows are streamed to the CSV as each run finishes instead of being kept in memory.
+    with open(out_csv, "w", newline="") as f, Pool(jobs, maxtasksperchild=1) as pool:
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
+
+        for row in pool.imap_unordered(_run_one, tasks):
+            writer.writerow(row)
+            file, cnf_path, h, status, runtime_sec, decisions, conflicts = row[:7]
             print(
-                f"[{h}] {os.path.basename(cnf_path)} -> {result.status} "
-                f"({row['runtime_sec']}s, decisions={row['decisions']}, conflicts={row['conflicts']})"
+                f"[{h}] {file} -> {status} "
+                f"({runtime_sec}s, decisions={decisions}, conflicts={conflicts})"
             )
 
-        # Emit warning if mismatched outputs are detected across heuristics
-        if check_results and "SAT" in results.values() and "UNSAT" in results.values():
-            raise ValueError(f"WARNING: found inconsistent results:\n {results}\nfor file {cnf_path}")
-
-    fieldnames = list(rows[0].keys()) if rows else []
-    with open(out_csv, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
+            # Emit warning if mismatched outputs are detected across heuristics
+            statuses = results.setdefault(cnf_path, {})
+            statuses[h] = status
+            if check_results and "SAT" in statuses.values() and "UNSAT" in statuses.values():
+                raise ValueError(f"WARNING: found inconsistent results:\n {statuses}\nfor file {cnf_path}")
 
     print(f"\nSaved results to: {out_csv}")
 
@@ -97,6 +115,7 @@ if __name__ == "__main__":
     ap.add_argument("--no-baseline", action="store_true")
     ap.add_argument("--no-vsids", action="store_true")
     ap.add_argument("--check-results", action="store_true")
+    ap.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all CPUs)")
     args = ap.parse_args()
 
     cnfs = find_cnf_files(args.path)
@@ -107,5 +126,6 @@ if __name__ == "__main__":
         seed=args.seed,
         run_baseline=not args.no_baseline,
         run_vsids=not args.no_vsids,
-        check_results=args.check_results
+        check_results=args.check_results,
+        jobs=args.jobs,
     )
\ No newline at end of file
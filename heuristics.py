@@ -1,46 +1,75 @@
 """Decision heuristics for CDCL.
 
 - Baseline: pick a random unassigned literal.
-- VSIDS: bump literals in learned clauses, decay sometimes, pick max activity.
+- VSIDS: bump literals in learned clauses, decay after every conflict (by
+  default), pick max activity. Variables that were assigned before are decided
+  with their last polarity (phase saving).
+  Decay is implemented MiniSat-style by growing the bump instead of shrinking
+  every activity, with an occasional rescale to avoid float overflow.
+
+Heuristics are notified of learned clauses, conflicts and backjumps (with the
+literals that became unassigned) through the on_* hooks.
 """
 
 from __future__ import annotations
 
 import random
-from typing import Dict, Iterable, List, Optional, Set
-
-from core import BoolLiteral, Clause, Model
+from array import array
+from typing import List, Optional, Sequence
 
-
-def extract_variables(clauses: Iterable[Clause]) -> List[str]:
-    """Collect all variable names that appear in the CNF."""
-    vars_set: Set[str] = set()
-    for clause in clauses:
-        for lit in clause:
-            vars_set.add(lit.variable)
-    return sorted(vars_set)
+from core import (
+    FALSE,
+    TRUE,
+    UNASSIGNED,
+    Clause,
+    Lit,
+    Model,
+    is_pos,
+    make_lit,
+    make_neg,
+    make_pos,
+    negate,
+    var,
+)
 
 
 class RandomBaselineHeuristic:
     """Baseline: pick an unassigned literal uniformly at random."""
 
-    def __init__(self, variables: List[str], seed: int = 0):
+    __slots__ = ("variables", "rng", "unassigned", "positions")
+
+    def __init__(self, variables: Sequence[int], seed: int = 0):
         self.variables = variables
         self.rng = random.Random(seed)
 
-    def pick_decision(self, model: Model) -> Optional[BoolLiteral]:
-        #unassigned_vars = [
-        #    v
-        #    for v in self.variables
-        #    if BoolLiteral.make_pos(v) not in model and BoolLiteral.make_neg(v) not in model
-        #]
-        unassigned_vars = [v for v in self.variables if not model.assigned(v)]
-        if not unassigned_vars:
-            return None
+        # Candidate variables, with positions[v] the index of v in unassigned (-1 if
+        # absent). Assigned variables are swap-removed lazily when picked, and
+        # on_backjump puts unassigned ones back.
+        self.unassigned: List[int] = list(variables)
+        self.positions = array("i", [-1]) * (max(variables, default=0) + 1)
+        for i, v in enumerate(variables):
+            self.positions[v] = i
+
+    def _remove(self, i: int) -> None:
+        # Swap with the last entry and pop, so removal is O(1).
+        unassigned, positions = self.unassigned, self.positions
+        removed, last = unassigned[i], unassigned[-1]
+        unassigned[i] = last
+        positions[last] = i
+        positions[removed] = -1
+        unassigned.pop()
 
-        v = self.rng.choice(unassigned_vars)
-        polarity = self.rng.choice([True, False])  # True means v, False means ¬v
-        return BoolLiteral(v, polarity)
+    def pick_decision(self, model: Model) -> Optional[Lit]:
+        unassigned = self.unassigned
+        while unassigned:
+            i = self.rng.randrange(len(unassigned))
+            v = unassigned[i]
+            if model.assigned(v):
+                self._remove(i)
+                continue
+            polarity = self.rng.choice([True, False])  # True means v, False means ¬v
+            return make_lit(v, polarity)
+        return None
 
     def on_learned_clause(self, clause: Clause, model: Model) -> None:
         return
@@ -48,17 +77,107 @@ class RandomBaselineHeuristic:
     def on_conflict(self) -> None:
         return
 
+    def on_backjump(self, unassigned: Sequence[Lit]) -> None:
+        positions = self.positions
+        for lit in unassigned:
+            v = var(lit)
+            if positions[v] < 0:
+                positions[v] = len(self.unassigned)
+                self.unassigned.append(v)
+
+
+class ActivityHeap:
+    """Indexed binary max-heap of literals ordered by activity (as in MiniSat's heap.h).
+
+    indices[lit] is the position of lit in heap, or -1 if lit is not in the heap.
+    """
+
+    __slots__ = ("activity", "heap", "indices")
+
+    def __init__(self, activity: Sequence[float]):
+        self.activity = activity
+        self.heap: List[Lit] = []
+        self.indices = array("i", [-1]) * len(activity)
+
+    def __contains__(self, lit: Lit) -> bool:
+        return self.indices[lit] >= 0
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def insert(self, lit: Lit) -> None:
+        if self.indices[lit] >= 0:
+            return
+        self.indices[lit] = len(self.heap)
+        self.heap.append(lit)
+        self._move_up(len(self.heap) - 1)
+
+    def increase(self, lit: Lit) -> None:
+        """Restore the heap order after lit's activity went up."""
+        if self.indices[lit] >= 0:
+            self._move_up(self.indices[lit])
+
+    def pop_max(self) -> Lit:
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.indices[top] = -1
+        if heap:
+            heap[0] = last
+            self.indices[last] = 0
+            self._move_down(0)
+        return top
+
+    def _move_up(self, pos: int) -> None:
+        heap, indices, activity = self.heap, self.indices, self.activity
+        lit = heap[pos]
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if activity[heap[parent]] >= activity[lit]:
+                break
+            heap[pos] = heap[parent]
+            indices[heap[pos]] = pos
+            pos = parent
+        heap[pos] = lit
+        indices[lit] = pos
+
+    def _move_down(self, pos: int) -> None:
+        heap, indices, activity = self.heap, self.indices, self.activity
+        lit = heap[pos]
+        size = len(heap)
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            if activity[heap[child]] <= activity[lit]:
+                break
+            heap[pos] = heap[child]
+            indices[heap[pos]] = pos
+            pos = child
+        heap[pos] = lit
+        indices[lit] = pos
+
 
 class VSIDSHeuristic:
     """Very small VSIDS implementation (easy version)."""
 
+    __slots__ = (
+        "variables", "rng", "bump", "decay_factor", "decay_period",
+        "conflict_count", "activity", "heap", "saved_phase",
+    )
+
+    # Activities above this are scaled down (together with the bump) to stay finite.
+    RESCALE_LIMIT = 1e100
+
     def __init__(
         self,
-        variables: List[str],
+        variables: Sequence[int],
         seed: int = 0,
         bump: float = 1.0,
         decay_factor: float = 0.95,
-        decay_period: int = 50,
+        decay_period: int = 1,
     ):
         self.variables = variables
         self.rng = random.Random(seed)
@@ -68,54 +187,76 @@ class VSIDSHeuristic:
         self.decay_period = decay_period
         self.conflict_count = 0
 
-        # Activity for both polarities.
-        self.activity: Dict[BoolLiteral, float] = {}
-        for v in self.variables:
-            self.activity[BoolLiteral.make_pos(v)] = 0.0
-            self.activity[BoolLiteral.make_neg(v)] = 0.0
-
-    def pick_decision(self, model: Model) -> Optional[BoolLiteral]:
-        candidates: List[BoolLiteral] = []
-        best_score = float("-inf")
+        # Activity for both polarities, indexed by literal.
+        num_lits = 2 * (max(self.variables, default=0) + 1)
+        self.activity = array("d", [0.0]) * num_lits
 
-        for v in self.variables:
-            if BoolLiteral.make_pos(v) in model or BoolLiteral.make_neg(v) in model:
-                continue
+        # Literals by activity. Literals of assigned variables are dropped lazily when
+        # they reach the top and re-inserted when a backjump unassigns them. The
+        # initial order is shuffled so that ties among equal activities are random.
+        self.heap = ActivityHeap(self.activity)
+        literals = [lit for v in self.variables for lit in (make_pos(v), make_neg(v))]
+        self.rng.shuffle(literals)
+        for lit in literals:
+            self.heap.insert(lit)
 
-            for lit in (BoolLiteral.make_pos(v), BoolLiteral.make_neg(v)):
-                score = self.activity.get(lit, 0.0)
-                if score > best_score:
-                    best_score = score
-                    candidates = [lit]
-                elif score == best_score:
-                    candidates.append(lit)
+        # Phase saving: the polarity each variable had when a backjump last unassigned
+        # it (TRUE or FALSE), or UNASSIGNED if it has not been unassigned yet.
+        self.saved_phase = array("b", [UNASSIGNED]) * (num_lits // 2)
 
-        if not candidates:
-            return None
-        return self.rng.choice(candidates)
+    def pick_decision(self, model: Model) -> Optional[Lit]:
+        heap = self.heap
+        while heap:
+            lit = heap.pop_max()
+            if model.is_unassigned(lit):
+                # The most active literal picks the variable; a saved phase overrides
+                # its polarity.
+                phase = self.saved_phase[var(lit)]
+                if phase != UNASSIGNED:
+                    return make_lit(var(lit), phase == TRUE)
+                return lit
+        return None
 
     def on_learned_clause(self, clause: Clause, model: Model) -> None:
+        # Called before the backjump, so every literal of the clause is still
+        # assigned. Bump them all: the heap picks up the new order on re-insert.
         for lit in clause:
-            if not model.assigned(lit.variable):
-                self.activity[lit] = self.activity.get(lit, 0.0) + self.bump
+            self.activity[lit] += self.bump
+            self.heap.increase(lit)
+            if self.activity[lit] > self.RESCALE_LIMIT:
+                self._rescale()
+
+    def _rescale(self) -> None:
+        # Uniform scaling keeps the heap order intact.
+        for lit in range(len(self.activity)):
+            self.activity[lit] /= self.RESCALE_LIMIT
+        self.bump /= self.RESCALE_LIMIT
 
     def on_conflict(self) -> None:
         self.conflict_count += 1
         if self.decay_period > 0 and (self.conflict_count % self.decay_period == 0):
-            for lit in list(self.activity.keys()):
-                self.activity[lit] *= self.decay_factor
+            # Multiplying every activity by decay_factor is equivalent (up to scale)
+            # to dividing the bump by it, which costs O(1).
+            self.bump /= self.decay_factor
+            if self.bump > self.RESCALE_LIMIT:
+                self._rescale()
+
+    def on_backjump(self, unassigned: Sequence[Lit]) -> None:
+        saved_phase = self.saved_phase
+        for lit in unassigned:
+            self.heap.insert(lit)
+            self.heap.insert(negate(lit))
+            saved_phase[var(lit)] = TRUE if is_pos(lit) else FALSE
 
 
 def make_heuristic(
     name: str,
-    clauses: Iterable[Clause],
+    variables: Sequence[int],
     seed: int = 0,
     bump: float = 1.0,
     decay_factor: float = 0.95,
-    decay_period: int = 50,
+    decay_period: int = 1,
 ):
-    variables = extract_variables(clauses)
-
     name = name.lower().strip()
     if name in {"baseline", "random"}:
         return RandomBaselineHeuristic(variables, seed=seed)
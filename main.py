@@ -15,7 +15,7 @@ def main() -> None:
 
     ap.add_argument("--vsids-bump", type=float, default=1.0)
     ap.add_argument("--vsids-decay", type=float, default=0.95)
-    ap.add_argument("--vsids-decay-period", type=int, default=50)
+    ap.add_argument("--vsids-decay-period", type=int, default=1)
 
     ap.add_argument("--debug", action="store_true")
     args = ap.parse_args()
@@ -1,48 +1,61 @@
 """DIMACS CNF parser.
 
 Clauses can be split across multiple lines, so we read tokens until we hit 0.
+The file is read in binary mode and scanned as bytes, line by line (this also
+works for pipes and FIFOs, e.g. process substitution).
 """
 from __future__ import annotations
-from typing import List
-from core import Clause, BoolLiteral
+from typing import Iterable, List, Optional, Tuple
+from core import Clause, Lit, make_neg, make_pos
 
 
-def parse_dimacs(path: str) -> List[Clause]:
+def _read_lines(path: str) -> Iterable[bytes]:
+    with open(path, "rb") as f:
+        yield from f
+
+
+def parse_dimacs(path: str) -> Tuple[List[Clause], int]:
+    """Returns the clauses and the number of variables.
+
+    The variable count comes from the p cnf header, or is the largest variable id
+    used if there is no header.
+    """
     clauses: List[Clause] = []
-    current_lits: List[BoolLiteral] = []
+    current_lits: List[Lit] = []
     expected_clauses: Optional[int] = None
     expected_vars: Optional[int] = None
+    max_var = 0
+
+    for raw_line in _read_lines(path):
+        line = raw_line.strip()
+
+        if not line or line.startswith(b"c"):
+            continue
+
+        if line.startswith(b"p"):
+            parts = line.split()
+            if len(parts) >= 4 and parts[1].lower() == b"cnf":
+                expected_vars = int(parts[2])
+                expected_clauses = int(parts[3])
+            continue
 
+        if line.startswith(b"%"):
+            break
 
-    with open(path, "r") as f:
-        for raw_line in f:
-            line = raw_line.strip()
-
-            if not line or line.startswith("c"):
-                continue
-            
-            if line.startswith("p"):
-                parts = line.split()
-                if len(parts) >= 4 and parts[1].lower() == "cnf":
-                    expected_vars = int(parts[2])
-                    expected_clauses = int(parts[3])
-                continue
-
-            if line.startswith("%"):
-                break
-
-            for tok in line.split():
-                if tok == "0":
-                    # End of this clause
-                    if current_lits:
-                        clauses.append(Clause(*current_lits))
-                        current_lits = []
-                    continue
-
-                if tok.startswith("-"):
-                    current_lits.append(BoolLiteral.make_neg(tok[1:]))
-                else:
-                    current_lits.append(BoolLiteral.make_pos(tok))
+        for value in map(int, line.split()):
+            if value == 0:
+                # End of this clause
+                if current_lits:
+                    clauses.append(Clause(*current_lits))
+                    current_lits = []
+            elif value > 0:
+                current_lits.append(make_pos(value))
+                if value > max_var:
+                    max_var = value
+            else:
+                current_lits.append(make_neg(-value))
+                if -value > max_var:
+                    max_var = -value
 
     # If the file forgot a trailing 0, still keep the last clause.
     if current_lits:
@@ -54,8 +67,8 @@ def parse_dimacs(path: str) -> List[Clause]:
                 f"p cnf says {expected_clauses} clauses, got {len(clauses)}"
             )
     if expected_vars is not None:
-        vars_seen = {lit.variable for c in clauses for lit in c}
-        if not all(1 <= int(v) <= expected_vars for v in vars_seen):
+        if max_var > expected_vars:
             raise ValueError(f"variable(s) out of range [1, {expected_vars}]")
+        return clauses, expected_vars
 
-    return clauses
\ No newline at end of file
+    return clauses, max_var
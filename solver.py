@@ -6,69 +6,131 @@ This file is the *engine* that runs them until SAT/UNSAT/timeout.
 
 from __future__ import annotations
 
+import signal
 import time
-from dataclasses import dataclass
 from typing import Dict, List, Optional
 
-from core import BoolLiteral, Clause, Core, State
+from core import Clause, Core, State, is_pos, var
 from heuristics import make_heuristic
 
 
-@dataclass
+# Plain classes with __slots__ rather than dataclasses, so every instance has the
+# same fixed layout (which PyPy's JIT specializes on) and no per-instance dict.
 class SolveStats:
-    decisions: int = 0
-    conflicts: int = 0
-    learned_clauses: int = 0
-    propagations: int = 0
+    __slots__ = ("decisions", "conflicts", "learned_clauses", "propagations")
 
-
-@dataclass
-class SolveResult:
-    status: str  # "SAT", "UNSAT", or "TIMEOUT"
-    runtime_sec: float
-    stats: SolveStats
-    assignment: Dict[str, bool]
+    def __init__(
+        self,
+        decisions: int = 0,
+        conflicts: int = 0,
+        learned_clauses: int = 0,
+        propagations: int = 0,
+    ):
+        self.decisions = decisions
+        self.conflicts = conflicts
+        self.learned_clauses = learned_clauses
+        self.propagations = propagations
 
 
-def _assignment_dict(state: State) -> Dict[str, bool]:
-    out: Dict[str, bool] = {}
+class SolveResult:
+    __slots__ = ("status", "runtime_sec", "stats", "assignment")
+
+    def __init__(
+        self,
+        status: str,  # "SAT", "UNSAT", or "TIMEOUT"
+        runtime_sec: float,
+        stats: SolveStats,
+        assignment: Dict[int, bool],
+    ):
+        self.status = status
+        self.runtime_sec = runtime_sec
+        self.stats = stats
+        self.assignment = assignment
+
+
+def _assignment_dict(state: State) -> Dict[int, bool]:
+    out: Dict[int, bool] = {}
     for lit in state.model:
-        out[lit.variable] = lit.polarity
+        out[var(lit)] = is_pos(lit)
     return out
 
 
-def _is_clause_satisfied(clause: Clause, state: State) -> bool:
-    return any(lit in state.model for lit in clause)
-
-
-def _is_formula_satisfied(state: State) -> bool:
-    return all(_is_clause_satisfied(c, state) for c in state.clauses)
-
-
 def _unit_propagate_all(core: Core, stats: SolveStats) -> None:
-    """Naive propagation: scan every clause until nothing changes."""
-    changed = True
-    while changed and not core.in_conflict:
-        changed = False
-        for idx in range(len(core.state.clauses)):
-            if core.conflict(idx):
-                stats.conflicts += 1
-                break
-            if core.propagate(idx):
-                stats.propagations += 1
-                changed = True
+    """Watched-literal propagation of everything assigned since the last call."""
+    stats.propagations += core.propagate_all()
+    if core.in_conflict:
+        stats.conflicts += 1
+
+
+class _Alarm:
+    """Timeout flag driven by SIGALRM: expired becomes True after timeout_sec.
+
+    armed is False when no timer could be set (no setitimer, e.g. on Windows, not
+    running in the main thread, or a timeout setitimer cannot represent such as inf);
+    the caller then has to poll the clock itself.
+
+    While armed, the alarm owns SIGALRM and ITIMER_REAL. cancel() puts back the
+    caller's handler and re-arms the caller's timer with whatever time it had left.
+    """
+
+    __slots__ = ("expired", "armed", "_previous", "_outer", "_armed_at")
+
+    def __init__(self, timeout_sec: float):
+        self.expired = False
+        self.armed = False
+        self._previous = None
+        self._outer = (0.0, 0.0)
+        self._armed_at = 0.0
+        if not (0 < timeout_sec < float("inf")) or not hasattr(signal, "setitimer"):
+            return
+        # getsignal() returns None for a handler not installed from Python, which
+        # signal.signal() cannot put back; SIG_DFL is the closest we can restore.
+        previous = signal.getsignal(signal.SIGALRM)
+        self._previous = signal.SIG_DFL if previous is None else previous
+        try:
+            signal.signal(signal.SIGALRM, self._on_alarm)
+        except ValueError:
+            return
+        try:
+            self._outer = signal.setitimer(signal.ITIMER_REAL, timeout_sec)
+        except (OverflowError, ValueError, signal.ItimerError):
+            # Too large for the platform's time_t: put the caller's handler back.
+            signal.signal(signal.SIGALRM, self._previous)
+            return
+        self._armed_at = time.perf_counter()
+        self.armed = True
+
+    def _on_alarm(self, signum, frame) -> None:
+        self.expired = True
+
+    def cancel(self) -> None:
+        if self.armed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous)
+            self.armed = False
+            delay, interval = self._outer
+            if delay > 0:
+                # A timer that would have gone off meanwhile fires right away.
+                remaining = delay - (time.perf_counter() - self._armed_at)
+                signal.setitimer(signal.ITIMER_REAL, max(remaining, 1e-6), interval)
 
 
 def _compute_backjump_level(core: Core) -> int:
-    assert core.graph.conflict_clause is not None
+    assert core.conflict_clause is not None
 
+    # Second-highest level of the learned clause, in one pass. Every literal of the
+    # conflict clause is still assigned (false), so its decision_levels entry is up to
+    # date rather than stale from an earlier backjump.
     uip_neg = core.get_uip()
-    others = core.graph.conflict_clause - {uip_neg}
-
-    if not others:
-        return 0
-    return max(core.state.model.get_level(l) for l in others)
-    
+    decision_levels = core.state.model.decision_levels
+    bj = 0
+    for lit in core.conflict_clause:
+        if lit == uip_neg:
+            continue
+        lvl = decision_levels[var(lit)]
+        if lvl > bj:
+            bj = lvl
+    return bj
 
 
 def solve_cnf(
@@ -78,15 +140,19 @@ def solve_cnf(
     seed: int = 0,
     vsids_bump: float = 1.0,
     vsids_decay_factor: float = 0.95,
-    vsids_decay_period: int = 50,
+    vsids_decay_period: int = 1,
     debug: bool = False,
+    num_vars: Optional[int] = None,
 ) -> SolveResult:
-    state = State(list(clauses))
+    state = State(clauses, num_vars)
     core = Core(state)
 
+    variables = range(1, state.num_vars + 1)
+    n_vars = state.num_vars
+
     heuristic = make_heuristic(
         heuristic_name,
-        state.clauses,
+        variables,
         seed=seed,
         bump=vsids_bump,
         decay_factor=vsids_decay_factor,
@@ -95,58 +161,65 @@ def solve_cnf(
 
     stats = SolveStats()
     start = time.perf_counter()
+    alarm = _Alarm(timeout_sec)
+    # Without SIGALRM, fall back to polling the clock once per iteration.
+    poll = not alarm.armed
+    deadline = start + timeout_sec
 
-    def timed_out() -> bool:
-        return (time.perf_counter() - start) > timeout_sec
+    try:
+        while True:
 
-    while True:
+            if alarm.expired or (poll and time.perf_counter() > deadline):
+                return SolveResult("TIMEOUT", time.perf_counter() - start, stats, _assignment_dict(state))
 
-        if timed_out():
-            return SolveResult("TIMEOUT", time.perf_counter() - start, stats, _assignment_dict(state))
+            # 1) Propagate
+            _unit_propagate_all(core, stats)
 
-        # 1) Propagate
-        _unit_propagate_all(core, stats)
+            # 2) Conflict?
+            if core.in_conflict:
+                if core.fail():
+                    return SolveResult("UNSAT", time.perf_counter() - start, stats, _assignment_dict(state))
 
-        # 2) Conflict?
-        if core.in_conflict:
-            if core.fail():
-                return SolveResult("UNSAT", time.perf_counter() - start, stats, _assignment_dict(state))
+                core.explain()
 
-            core.explain()
+                learned = core.learn()
+                if learned is not None:
+                    stats.learned_clauses += 1
+                    heuristic.on_learned_clause(learned, core.state.model)
 
-            learned = core.learn()
-            if learned is not None:
-                stats.learned_clauses += 1
-                heuristic.on_learned_clause(learned, core.state.model)
+                heuristic.on_conflict()
 
-            heuristic.on_conflict()
+                bj = _compute_backjump_level(core)
+                unassigned = core.state.model.literals_above(bj)
+                core.backjump(bj)
+                heuristic.on_backjump(unassigned)
 
-            bj = _compute_backjump_level(core)
-            core.backjump(bj)
+                if debug:
+                    print("--- conflict handled, backjump to", bj)
 
-            if debug:
-                print("--- conflict handled, backjump to", bj)
+                continue
 
-            continue
-
-        # 3) SAT?
-        if _is_formula_satisfied(state):
-            state.sat = True
-            return SolveResult("SAT", time.perf_counter() - start, stats, _assignment_dict(state))
+            # 3) SAT? Propagation reached a fixpoint without conflict, so once every
+            # variable is assigned, every clause is satisfied.
+            if len(state.model.assignment) == n_vars:
+                state.sat = True
+                return SolveResult("SAT", time.perf_counter() - start, stats, _assignment_dict(state))
 
-        # 4) Decide
-        lit = heuristic.pick_decision(state.model)
-        if lit is None:
-            state.unsat = True
-            return SolveResult("UNSAT", time.perf_counter() - start, stats, _assignment_dict(state))
+            # 4) Decide
+            lit = heuristic.pick_decision(state.model)
+            if lit is None:
+                state.unsat = True
+                return SolveResult("UNSAT", time.perf_counter() - start, stats, _assignment_dict(state))
 
-        if core.decide(lit):
-            stats.decisions += 1
+            if core.decide(lit):
+                stats.decisions += 1
+    finally:
+        alarm.cancel()
 
 
 def solve_dimacs(path: str, **kwargs) -> SolveResult:
     from parser import parse_dimacs
-    clauses = parse_dimacs(path)
-    result = solve_cnf(clauses, **kwargs)
+    clauses, num_vars = parse_dimacs(path)
+    result = solve_cnf(clauses, num_vars=num_vars, **kwargs)
 
     return result
\ No newline at end of file